@@ -7,6 +7,7 @@
 # supported, Bank1 registers such as timestamps and monthly/yearly alarm are not.  
 
 import time
+import micropython
 from micropython import const
 
 _SLAVE_ADDRESS = const(0x32)
@@ -37,6 +38,13 @@ _MONTH_MASK = const(0x1F)
 
 _24H_MASK = const(0x80)
 
+# BCD to decimal lookup table; invalid BCD codes map to 0.
+_BCD2DEC = bytes(
+    ((b >> 4) * 10 + (b & 0x0F)) if ((b >> 4) < 10 and (b & 0x0F) < 10) else 0
+    for b in range(256))
+# Decimal [0,99] to BCD lookup table.
+_DEC2BCD = bytes(((d // 10) << 4) | (d % 10) for d in range(100))
+
 # Control1 masks
 _WEEKLY_ALM_EN_MASK = const(0x80) # Use this with /INTRB.
 _MONTHLY_ALM_EN_MASK = const(0x40) # Use this with /INTRA.
@@ -72,82 +80,85 @@ THU = const(0x10)
 FRI = const(0x20)
 SAT = const(0x40)
 
+@micropython.native
+def _check_range(value, lo, hi, name):
+    if value is None or not lo <= value <= hi:
+        raise ValueError('%s is out of range [%d,%d].' % (name, lo, hi))
+
+# Month offsets for Sakamoto's weekday algorithm.
+_SAKAMOTO = bytes((0, 3, 2, 5, 0, 3, 5, 1, 4, 6, 2, 4))
+
+@micropython.viper
+def _get_weekday(date: int, month: int, year: int) -> int:
+    t = ptr8(_SAKAMOTO)
+    if month < 3:
+        year -= 1
+    # +6 gives 0 for Monday instead of Sunday, same as time.localtime().
+    return (year + year // 4 - year // 100 + year // 400 + t[month - 1] + date + 6) % 7
+
 class RX8035:
     def __init__(self, i2c, address=_SLAVE_ADDRESS):
         """Initialization needs to be given an initialized I2C port
         """
         self.i2c = i2c
         self.address = address
+        self._wvto = i2c.writevto # Cache bound methods.
+        self._rmem = i2c.readfrom_mem_into
         self._buffer = bytearray(_CONTROL2_REG - _SEC_REG + 1)
-        self._bytebuf = bytearray(1)
+        self._ptrbuf = bytearray(1) # Register pointer for writevto().
         self._mv = memoryview(self._buffer)
         self._mv_datetime = self._mv[_SEC_REG:_YEAR_REG + 1]
         self._mv_controls = self._mv[_CONTROL1_REG:_CONTROL2_REG + 1]
-
-        self._DATETIME_MASK = bytes((
-            _minuteS_MASK, 
-            _minuteS_MASK, 
-            _HOUR_MASK, 
-            _WEEKDAY_MASK, 
-            _DATE_MASK, 
-            _MONTH_MASK, 
-            _YEAR_MASK))
+        self._mv_offset = self._mv[_DIGITAL_OFFSET_REG:_DIGITAL_OFFSET_REG + 1]
+        self._mv_control1 = self._mv[_CONTROL1_REG:_CONTROL1_REG + 1]
+        self._mv_offset_controls = self._mv[_DIGITAL_OFFSET_REG:_CONTROL2_REG + 1]
+        # Alarm registers through Control2, for a single transfer each.
+        self._mv_daily_alarm = self._mv[_MONTHLY_ALM_MIN_REG:_CONTROL2_REG + 1]
+        self._mv_weekly_alarm = self._mv[_WEEKLY_ALM_MIN_REG:_CONTROL2_REG + 1]
+        # Register address in the upper nibble; transmission format 0.
+        self._REG_PTRS = bytes(((r << 4) & 0xFF) for r in range(_CONTROL2_REG + 1))
 
         # Check RTC status.
         self.init_error = False
-        value = self.__read_byte(_CONTROL2_REG)
-        if any((
-            pon := bool(value & _PON_MASK), 
-            xstp := bool(value & _XSTP_MASK), 
-            vdet := bool(value & _VDET_MASK), 
-            )):
+        self.resync_controls() # Control1 is shadowed in _buffer from here on.
+        value = self._buffer[_CONTROL2_REG]
+        if value & (_PON_MASK | _XSTP_MASK | _VDET_MASK):
             self.init_error = True
-            print(f'RTC status error. PON: {pon}, XSTP: {xstp}, VDET: {vdet}')
+            print('RTC status error. Control2:', hex(value)) # PON 0x10, XSTP 0x20, VDET 0x40.
             self._mv_controls[:] = b'\x00\x00'
             self.__write_bytes(_CONTROL_REGS, self._mv_controls)
 
-    def __write_byte(self, reg, val):
-        self._bytebuf[0] = val & 0xff
-        self.__write_bytes(reg, self._bytebuf)
+    def resync_controls(self):
+        """Reload the shadow copy of the control registers from RX-8035.
 
-    def __read_byte(self, reg):
-        self.__read_bytes(reg, self._bytebuf)
-        return self._bytebuf[0]
+           Needed only if the registers were changed by other than this driver.
+        """
+        self.__read_bytes(_CONTROL_REGS, self._mv_controls)
 
     def __write_bytes(self, reg, buffer):
-        self.i2c.writeto_mem(self.address, (reg << 4) & 0xFF, buffer)
+        # Send register pointer and data in a single transfer.
+        self._ptrbuf[0] = self._REG_PTRS[reg]
+        self._wvto(self.address, (self._ptrbuf, buffer))
 
     def __read_bytes(self, reg, buffer):
-        self.i2c.readfrom_mem_into(self.address, (reg << 4) & 0xFF, buffer)
-
-    def __bcd2dec(self, bcd):
-        return (((bcd & 0xf0) >> 4) * 10 + (bcd & 0x0f))
-
-    def __dec2bcd(self, dec):
-        tens, units = divmod(dec, 10)
-        return (tens << 4) + units
-
-    def __get_weekday(self, date, month, year):
-        if month < 3:
-            month += 12
-            year -= 1
-        weekday = (
-            (-1 + date + (13 * month + 8) // 5 + year + year // 4 
-            - year // 100 + year // 400)
-            % 7)
-        return weekday
+        # Register pointer is followed by a repeated start, not by a stop.
+        self._rmem(self.address, self._REG_PTRS[reg], buffer)
 
     def datetime(self):
         """Return a tuple such as (year, month, date, weekday, hours, minutes,
         seconds).
         """
-        self.__read_bytes(_DATETIME_REG, self._mv_datetime)
-
-        seconds, minutes, hours, weekday, date, month, year = (
-            self.__bcd2dec(a & b) for a, b in zip(
-            self._mv_datetime, self._DATETIME_MASK))
-
-        return (year, month, date, weekday, hours, minutes, seconds)
+        mv = self._mv_datetime
+        self.__read_bytes(_DATETIME_REG, mv)
+
+        return (
+            _BCD2DEC[mv[_YEAR_REG] & _YEAR_MASK],
+            _BCD2DEC[mv[_MONTH_REG] & _MONTH_MASK],
+            _BCD2DEC[mv[_DATE_REG] & _DATE_MASK],
+            mv[_WEEKDAY_REG] & _WEEKDAY_MASK,
+            _BCD2DEC[mv[_HR_REG] & _HOUR_MASK],
+            _BCD2DEC[mv[_MIN_REG] & _minuteS_MASK],
+            _BCD2DEC[mv[_SEC_REG] & _minuteS_MASK])
 
     def write_all(self, seconds=None, minutes=None, hours=None, weekday=None,
                   date=None, month=None, year=None):
@@ -155,34 +166,35 @@ class RX8035:
         Range: seconds [0,59], minutes [0,59], hours [0,23],
                weekday [0,6], date [1,31], month [1,12], year [0,99].
         """
-        if (seconds is None) or seconds < 0 or seconds > 59:
-            raise ValueError('Seconds is out of range [0,59].')
-        if (minutes is None) or minutes < 0 or minutes > 59:
-            raise ValueError('Minutes is out of range [0,59].')
-        if (hours is None) or hours < 0 or hours > 23:
-            raise ValueError('Hours is out of range [0,23].')
-        if (date is None) or date < 1 or date > 31:
-            raise ValueError('Date is out of range [1,31].')
-        if (month is None) or month < 1 or month > 12:
-            raise ValueError('Month is out of range [1,12].')
-        if (year is None) or year < 0 or year > 99:
-            raise ValueError('Years is out of range [0,99].')
+        _check_range(seconds, 0, 59, 'Seconds')
+        _check_range(minutes, 0, 59, 'Minutes')
+        _check_range(hours, 0, 23, 'Hours')
+        _check_range(date, 1, 31, 'Date')
+        _check_range(month, 1, 12, 'Month')
+        _check_range(year, 0, 99, 'Years')
         if weekday is None:
-            weekday = self.__get_weekday(date, month, year + 2000)
-        elif weekday < 0 or weekday > 6:
-            raise ValueError('Day is out of range [0,6].')
-
-        self._buffer[_SEC_REG] = self.__dec2bcd(seconds)
-        self._buffer[_MIN_REG] = self.__dec2bcd(minutes)
-        self._buffer[_HR_REG] = self.__dec2bcd(hours) | _24H_MASK # 12 hour mode currently not supported.
-        self._buffer[_DATE_REG] = self.__dec2bcd(date)
-        self._buffer[_WEEKDAY_REG] = self.__dec2bcd(weekday)
-        self._buffer[_MONTH_REG] = self.__dec2bcd(month)
-        self._buffer[_YEAR_REG] = self.__dec2bcd(year)
-
-        self.__read_byte(_CONTROL2_REG) # Read Control2 register.
-        self.__write_bytes(_DATETIME_REG, self._mv_datetime) # Set datetime registers.
-        self.__write_byte(_CONTROL2_REG, self._bytebuf[0]  & ~_VDET_MASK) # Clear VDET in Control2 register.
+            weekday = _get_weekday(date, month, year + 2000)
+        else:
+            _check_range(weekday, 0, 6, 'Day')
+        self.__write_all_unchecked(
+            seconds, minutes, hours, weekday, date, month, year)
+
+    def __write_all_unchecked(self, seconds, minutes, hours, weekday,
+                              date, month, year):
+        self._mv_datetime[:] = bytes((
+            _DEC2BCD[seconds],
+            _DEC2BCD[minutes],
+            _DEC2BCD[hours] | _24H_MASK, # 12 hour mode currently not supported.
+            _DEC2BCD[weekday],
+            _DEC2BCD[date],
+            _DEC2BCD[month],
+            _DEC2BCD[year]))
+
+        # Read registers following datetime (offset, alarms, user RAM and controls),
+        # then write all of them back with datetime in one transaction.
+        self.__read_bytes(_DIGITAL_OFFSET_REG, self._mv_offset_controls)
+        self._buffer[_CONTROL2_REG] &= ~_VDET_MASK # Clear VDET in Control2 register.
+        self.__write_bytes(_DATETIME_REG, self._mv)
 
     def set_datetime(self, dt):
         """Input a tuple such as (year, month, date, weekday, hours, minutes,
@@ -194,17 +206,20 @@ class RX8035:
     def write_now(self):
         """Write the current system time to RX-8035
         """
-        self.set_datetime(time.localtime())
+        # Values from localtime() are always in range; skip validation.
+        t = time.localtime()
+        self.__write_all_unchecked(t[5], t[4], t[3], t[6], t[2], t[1], t[0] % 100)
 
     def digital_offset(self, value=None):
         """Read/Set clock adjustment, from 63 (-189.10 ppm) to -62 (+189.10 ppm); default is 0 (OFF).
         """
         if value is None:
-            value = self._buffer[_DIGITAL_OFFSET_REG] = self.__read_byte(_DIGITAL_OFFSET_REG)
+            self.__read_bytes(_DIGITAL_OFFSET_REG, self._mv_offset)
+            value = self._buffer[_DIGITAL_OFFSET_REG]
             return -(value ^ 0x7F) -1 if (value & 0x40) else value
         elif -62 <= value <= 63:
             self._buffer[_DIGITAL_OFFSET_REG] = value & 0x7F
-            self.__write_byte(_DIGITAL_OFFSET_REG, self._buffer[_DIGITAL_OFFSET_REG])
+            self.__write_bytes(_DIGITAL_OFFSET_REG, self._mv_offset)
         else:
             print('Value error.')
 
@@ -214,34 +229,31 @@ class RX8035:
            Specify either of mode=CONST_TIME_INT_1HZ or mode=CONST_TIME_INT_2HZ to set,
            otherwise reset.
         """
-        self._buffer[_CONTROL1_REG] = self.__read_byte(_CONTROL1_REG) & ~(_CT2_MASK|_CT1_MASK|_CT0_MASK)
+        self._buffer[_CONTROL1_REG] &= ~(_CT2_MASK|_CT1_MASK|_CT0_MASK)
         if mode in (CONST_TIME_INT_1HZ, CONST_TIME_INT_2HZ):
             self._buffer[_CONTROL1_REG] |= mode
-        self.__write_byte(_CONTROL1_REG, self._buffer[_CONTROL1_REG])
+        self.__write_bytes(_CONTROL1_REG, self._mv_control1)
 
     def daily_alarm(self, hours=None, minutes=None):
         """Set/Reset daily alarm on /INTRA.
         
            Specify hours & minutes arguments to set, otherwise reset.
         """
-        self.__read_bytes(_CONTROL_REGS, self._mv_controls)
+        self.__read_bytes(_MONTHLY_ALM_MIN_REG, self._mv_daily_alarm)
         if all((hours is None, minutes is None)):
             self._buffer[_MONTHLY_ALM_HR_REG] = self._buffer[_MONTHLY_ALM_MIN_REG] = 0
             self._buffer[_CONTROL1_REG] &= ~_MONTHLY_ALM_EN_MASK
         else:
             if minutes is None: minutes = 0 
             if hours is None: hours = 0 
-            if minutes < 0 or minutes > 59:
-                raise ValueError('Minutes is out of range [0,59].')
-            self._buffer[_MONTHLY_ALM_MIN_REG] = self.__dec2bcd(minutes) & _minuteS_MASK
-            if hours < 0 or hours > 23:
-                raise ValueError('Hours is out of range [0,23].')
-            self._buffer[_MONTHLY_ALM_HR_REG] = self.__dec2bcd(hours) & _HOUR_MASK
+            _check_range(minutes, 0, 59, 'Minutes')
+            self._buffer[_MONTHLY_ALM_MIN_REG] = _DEC2BCD[minutes]
+            _check_range(hours, 0, 23, 'Hours')
+            self._buffer[_MONTHLY_ALM_HR_REG] = _DEC2BCD[hours]
             self._buffer[_CONTROL1_REG] |= _MONTHLY_ALM_EN_MASK
 
         self._buffer[_CONTROL2_REG] &= ~_MONTHLY_ALM_FUNC_G_MASK
-        self.__write_bytes(_CONTROL_REGS, self._mv_controls)
-        self.__write_bytes(_MONTHLY_ALM_MIN_REG, self._mv[_MONTHLY_ALM_MIN_REG:_MONTHLY_ALM_HR_REG + 1])
+        self.__write_bytes(_MONTHLY_ALM_MIN_REG, self._mv_daily_alarm)
 
     def restart_daily_alarm(self):
         """Restart daily alarm without changing the parameters.
@@ -260,26 +272,23 @@ class RX8035:
            Specify weekdays asfollows:
                weekdays=MON|TUE|WED|THU|FRI
         """
-        self.__read_bytes(_CONTROL_REGS, self._mv_controls)
+        self.__read_bytes(_WEEKLY_ALM_MIN_REG, self._mv_weekly_alarm)
         if all((hours is None, minutes is None, weekdays is None)):
             self._buffer[_WEEKLY_ALM_HR_REG] = self._buffer[_WEEKLY_ALM_MIN_REG] = 0
             self._buffer[_CONTROL1_REG] &= ~_WEEKLY_ALM_EN_MASK
         else:
             if minutes is None: minutes = 0 
-            elif minutes < 0 or minutes > 59:
-                raise ValueError('Minutes is out of range [0,59].')
-            self._buffer[_WEEKLY_ALM_MIN_REG] = self.__dec2bcd(minutes) & _minuteS_MASK
+            _check_range(minutes, 0, 59, 'Minutes')
+            self._buffer[_WEEKLY_ALM_MIN_REG] = _DEC2BCD[minutes]
             if hours is None: hours = 0 
-            elif hours < 0 or hours > 23:
-                raise ValueError('Hours is out of range [0,23].')
-            self._buffer[_WEEKLY_ALM_HR_REG] = self.__dec2bcd(hours) & _HOUR_MASK
+            _check_range(hours, 0, 23, 'Hours')
+            self._buffer[_WEEKLY_ALM_HR_REG] = _DEC2BCD[hours]
             if weekdays:
                 self._buffer[_WEEKLY_ALM_WEEKDAY_REG] = weekdays & 0x7F
             self._buffer[_CONTROL1_REG] |= _WEEKLY_ALM_EN_MASK
 
         self._buffer[_CONTROL2_REG] &= ~_WEEKLY_ALM_FUNC_G_MASK
-        self.__write_bytes(_CONTROL_REGS, self._mv_controls)
-        self.__write_bytes(_WEEKLY_ALM_MIN_REG, self._mv[_WEEKLY_ALM_MIN_REG:_WEEKLY_ALM_WEEKDAY_REG + 1])
+        self.__write_bytes(_WEEKLY_ALM_MIN_REG, self._mv_weekly_alarm)
 
     def restart_weekly_alarm(self):
         """Restart weekly alarm without changing the parameters.
@@ -0,0 +1,63 @@
+# (c) 2024 ekspla.
+# MIT License.  https://github.com/ekspla/micropython_rx-8035
+#
+# Host-side (CPython) helpers for RX-8035SA/LC register data, e.g. to decode
+# datetime registers dumped in logs without the hardware.
+#
+# Numba and NumPy are optional: without Numba the functions run as plain Python,
+# and decode_datetime_array() is available only with NumPy.
+
+try:
+    from numba import njit
+except ImportError:
+    njit = lambda f: f
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Masks of seconds, minutes, hours, weekday, date, month and year registers.
+_DATETIME_MASK = (0x7F, 0x7F, 0x3F, 0x07, 0x3F, 0x1F, 0xFF)
+# Month offsets for Sakamoto's weekday algorithm.
+_SAKAMOTO = (0, 3, 2, 5, 0, 3, 5, 1, 4, 6, 2, 4)
+
+@njit
+def bcd2dec(bcd):
+    return ((bcd & 0xf0) >> 4) * 10 + (bcd & 0x0f)
+
+@njit
+def dec2bcd(dec):
+    return ((dec // 10) << 4) | (dec % 10)
+
+@njit
+def get_weekday(date, month, year):
+    """Return weekday [0,6] as written by RX8035.write_all().
+    """
+    if month < 3:
+        year -= 1
+    return (year + year // 4 - year // 100 + year // 400 + _SAKAMOTO[month - 1] + date + 6) % 7
+
+def decode_datetime(buf):
+    """Decode 7 bytes of datetime registers into a tuple such as (year, month,
+    date, weekday, hours, minutes, seconds), same as RX8035.datetime().
+    """
+    seconds, minutes, hours, weekday, date, month, year = (
+        bcd2dec(a & b) for a, b in zip(buf, _DATETIME_MASK))
+    return (year, month, date, weekday, hours, minutes, seconds)
+
+def decode_datetime_array(buf):
+    """Decode an (N, 7) or wider uint8 array of datetime registers into an
+    (N, 7) array of (year, month, date, weekday, hours, minutes, seconds).
+    """
+    if np is None:
+        raise ImportError('decode_datetime_array() requires numpy.')
+    values = _BCD2DEC[np.asarray(buf, dtype=np.uint8)[:, :7] & _DATETIME_MASK_ARRAY]
+    return values[:, ::-1]
+
+if np is not None:
+    # Invalid BCD codes map to 0, same as the lookup table in rx8035.py.
+    _BCD2DEC = np.array([
+        bcd2dec(b) if ((b >> 4) < 10 and (b & 0x0F) < 10) else 0
+        for b in range(256)], dtype=np.uint8)
+    _DATETIME_MASK_ARRAY = np.array(_DATETIME_MASK, dtype=np.uint8)